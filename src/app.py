@@ -2,67 +2,186 @@ import gradio as gr
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.responses import PlainTextResponse
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
+import anyio
+import zstandard
 
 import os
 import hmac
-import hashlib
-import subprocess
-from time import time
+import asyncio
+import logging
+from collections import OrderedDict, defaultdict
+from time import monotonic, perf_counter
+
+# Configured before importing the app modules so their import-time logs are handled
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+logger = logging.getLogger(__name__)
 
 from src.video_downloader import AsyncVideoDownloader
+from src.utils.video_url import extract_video_id
 from src.transcript_summarizer import AsyncTranscriptSummarizer
 
+# The hiredis parser is picked up automatically when installed (redis[hiredis])
+redis_client = Redis(
+    host="redis-ytb-summarizer", port=6379, db=0, decode_responses=False
+)
 downloader = AsyncVideoDownloader()
-summarizer = AsyncTranscriptSummarizer()
-redis_client = Redis(host="redis-ytb-summarizer", port=6379, db=0)
+summarizer = AsyncTranscriptSummarizer(redis_client=redis_client)
+
+ZSTD_MAGIC_NUMBER = b"\x28\xb5\x2f\xfd"
+zstd_compressor = zstandard.ZstdCompressor(level=3)
+zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def compress_transcript(transcript):
+    return zstd_compressor.compress(transcript.encode("utf-8"))
+
+
+def decompress_transcript(cached_transcript):
+    # Transcripts cached before compression was introduced are stored as plain text
+    if cached_transcript.startswith(ZSTD_MAGIC_NUMBER):
+        cached_transcript = zstd_decompressor.decompress(cached_transcript)
+    return cached_transcript.decode("utf-8", "replace")
+
+
+LOCAL_CACHE_SIZE = 512
+# Entries expire so that clearing the Redis cache reaches the running workers too
+LOCAL_CACHE_TTL = int(os.getenv("LOCAL_CACHE_TTL", "300"))
+local_cache = OrderedDict()
+video_locks = {}
+video_lock_users = defaultdict(int)
+
+
+def get_local_cache(video_id):
+    entry = local_cache.get(video_id)
+    if entry is None:
+        return None, None
+    summary, transcript, expires_at = entry
+    if monotonic() >= expires_at:
+        del local_cache[video_id]
+        return None, None
+    local_cache.move_to_end(video_id)
+    return summary, transcript
+
+
+def set_local_cache(video_id, summary, transcript):
+    local_cache[video_id] = (summary, transcript, monotonic() + LOCAL_CACHE_TTL)
+    local_cache.move_to_end(video_id)
+    if len(local_cache) > LOCAL_CACHE_SIZE:
+        local_cache.popitem(last=False)
+
+
+LANGUAGE_CODES = {"french": "fr", "english": "en"}
 
 
 def validate_request(url):
-    if not url.startswith("https://www.youtube.com/"):
-        return False
-    return True
+    """
+    Validates a YouTube video URL and extracts its video ID.
 
+    Args:
+        url (str): The URL of the YouTube video.
+
+    Returns:
+        str or None: The video ID, or None if the URL is not a valid YouTube video URL.
+    """
+    return extract_video_id(url)
 
-async def summarize(url, language):
-    start = time()
 
-    if not validate_request(url):
+async def summarize(url, language):
+    video_id = validate_request(url)
+    if not video_id:
         raise gr.Error("Invalid YouTube URL. Please enter a valid YouTube URL.")
 
-    video_id = await downloader.get_video_id(url)
+    language_code = LANGUAGE_CODES[language.lower()]
 
-    language = language.lower()
-    language_codes = {"french": "fr", "english": "en"}
+    # Concurrent requests for the same video wait for the first one to finish
+    # and are then served from the local cache, the lock is only dropped once
+    # no request holds or waits on it anymore
+    lock = video_locks.setdefault(video_id, asyncio.Lock())
+    video_lock_users[video_id] += 1
+    try:
+        async with lock:
+            summary = await get_summary(url, video_id, language_code)
+    finally:
+        video_lock_users[video_id] -= 1
+        if not video_lock_users[video_id]:
+            del video_lock_users[video_id]
+            del video_locks[video_id]
 
-    cached_summary = await redis_client.get(f"{video_id}_summary")
+    return summary
+
+
+async def get_summary(url, video_id, language_code):
+    cached_summary, transcript = get_local_cache(video_id)
     if cached_summary:
-        print("Cached summary retrieved")
-        return cached_summary.decode("utf-8")
-
-    cached_transcript = await redis_client.get(f"{video_id}_transcript")
-    if cached_transcript:
-        transcript = cached_transcript.decode("utf-8")
-        print("Cached transcript retrieved")
-    else:
-        try:
-            transcript = await downloader.get_transcript(url, language_codes[language])
-            await redis_client.set(f"{video_id}_transcript", transcript)
-        except Exception:
-            raise gr.Error(
-                f"An error occurred while fetching or generating the transcript of the video."
+        logger.info("Locally cached summary retrieved")
+        return cached_summary
+
+    cached_transcript = None
+    if not transcript:
+        cached_summary, cached_transcript = await redis_client.mget(
+            f"{video_id}_summary", f"{video_id}_transcript"
+        )
+        if cached_summary:
+            logger.info("Cached summary retrieved")
+            summary = cached_summary.decode("utf-8", "replace")
+            set_local_cache(
+                video_id,
+                summary,
+                decompress_transcript(cached_transcript) if cached_transcript else None,
             )
+            return summary
+
+    # Only requests that are not served from the local or the Redis cache are timed
+    start = perf_counter()
+    new_transcript = False
+    if not transcript:
+        if cached_transcript:
+            transcript = decompress_transcript(cached_transcript)
+            logger.info("Cached transcript retrieved")
+        else:
+            try:
+                # Warm up the summarizer connection while the transcript is fetched
+                async with asyncio.TaskGroup() as tg:
+                    transcript_task = tg.create_task(
+                        downloader.get_transcript(video_id, language_code)
+                    )
+                    tg.create_task(summarizer.prewarm())
+                transcript = transcript_task.result()
+                new_transcript = True
+            except Exception:
+                raise gr.Error(
+                    f"An error occurred while fetching or generating the transcript of the video."
+                )
+        set_local_cache(video_id, None, transcript)
 
     try:
-        summary = await summarizer.summarize(transcript, language_codes[language])
-        await redis_client.set(f"{video_id}_summary", summary)
+        summary = await summarizer.summarize(transcript, language_code)
     except Exception:
+        if new_transcript:
+            try:
+                await redis_client.set(
+                    f"{video_id}_transcript", compress_transcript(transcript)
+                )
+            except RedisError:
+                logger.exception("Failed to cache the transcript of %s", video_id)
         raise gr.Error(
             f"An error occurred while summarizing the transcript of the video."
         )
 
-    end = time()
+    # Write the new keys in a single round trip, a Redis failure must not
+    # cost the user a summary that has already been generated
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(f"{video_id}_summary", summary)
+            if new_transcript:
+                pipe.set(f"{video_id}_transcript", compress_transcript(transcript))
+            await pipe.execute()
+    except RedisError:
+        logger.exception("Failed to cache the summary of %s", video_id)
+    set_local_cache(video_id, summary, transcript)
 
-    print(f"Total time to process request: {end - start:.2f}s")
+    logger.info("Total time to process request: %.2fs", perf_counter() - start)
 
     return summary
 
@@ -94,9 +213,28 @@ def gradio_app(use_queue=True):
     return interface
 
 
+DEPLOYMENT_SECRET_KEY = (os.getenv("DEPLOYMENT_SECRET_KEY") or "").encode() or None
+DEPLOYMENT_SCRIPT = os.getenv("DEPLOYMENT_SCRIPT", None)
+DEPLOYMENT_SCRIPT_EXISTS = bool(DEPLOYMENT_SCRIPT) and os.path.exists(
+    DEPLOYMENT_SCRIPT
+)
+
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "64"))
+
 app = FastAPI()
 
 
+@app.on_event("startup")
+async def configure_thread_pool():
+    # Gradio runs its sync handlers on anyio's default thread pool (40 threads by default)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+
+
+@app.on_event("shutdown")
+async def close_clients():
+    await summarizer.close()
+
+
 @app.post("/deployment-webhook")
 async def handle_webhook(request: Request):
 
@@ -108,41 +246,47 @@ async def handle_webhook(request: Request):
 
     payload = await request.body()
 
-    secret_key = os.getenv("DEPLOYMENT_SECRET_KEY", None)
-    if not secret_key:
+    if not DEPLOYMENT_SECRET_KEY:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Automatic deployment not configured",
         )
 
-    expected_signature = (
-        "sha256=" + hmac.new(secret_key.encode(), payload, hashlib.sha256).hexdigest()
-    )
-    if not hmac.compare_digest(signature, expected_signature):
+    try:
+        if not signature.startswith("sha256="):
+            raise ValueError
+        provided_signature = bytes.fromhex(signature.removeprefix("sha256="))
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid signature"
         )
 
-    deployment_script = os.getenv("DEPLOYMENT_SCRIPT", None)
-    if not deployment_script or not os.path.exists(deployment_script):
+    expected_signature = hmac.digest(DEPLOYMENT_SECRET_KEY, payload, "sha256")
+    if not hmac.compare_digest(provided_signature, expected_signature):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid signature"
+        )
+
+    if not DEPLOYMENT_SCRIPT_EXISTS:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Automatic deployment not configured",
         )
 
-    subprocess.Popen([deployment_script])
+    await asyncio.create_subprocess_exec(DEPLOYMENT_SCRIPT)
 
     return PlainTextResponse("Deployment triggered", status_code=status.HTTP_200_OK)
 
 
 @app.get("/health-check")
-def health_check():
+async def health_check():
     return {"message": "The app is properly running."}
 
 
-@app.get("/summarize")
+@app.get("/summarize", response_class=PlainTextResponse)
 async def summarize_endpoint(url: str, language: str):
-    return await summarize(url, language)
+    # The summary is already a Markdown string, there is no need to JSON encode it
+    return PlainTextResponse(await summarize(url, language))
 
 
 app = gr.mount_gradio_app(
@@ -152,4 +296,11 @@ app = gr.mount_gradio_app(
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "src.app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "2")),
+    )
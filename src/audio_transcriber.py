@@ -1,20 +1,72 @@
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, decode_audio
 import assemblyai as aai
+import ctranslate2
+import httpx
 
-from abc import ABC, abstractmethod
-from typing import Literal
+from typing import Literal, Protocol
 import os
 import asyncio
-from concurrent.futures import ProcessPoolExecutor
-from time import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "2"))
+_WHISPER_POOL = ThreadPoolExecutor(max_workers=WHISPER_WORKERS)
+_WHISPERCPP_POOL = ThreadPoolExecutor(max_workers=1)
+
+ASSEMBLYAI_MAX_CONNECTIONS = int(os.getenv("ASSEMBLYAI_MAX_CONNECTIONS", "32"))
+
+TRANSCRIBER_COMPUTE_TYPE = os.getenv("TRANSCRIBER_COMPUTE_TYPE", "int8")
+TRANSCRIBER_CPU_THREADS = int(
+    os.getenv("TRANSCRIBER_CPU_THREADS", str(max(1, (os.cpu_count() or 2) // 2)))
+)
+
+_SUPPORTED_COMPUTE_TYPES = ctranslate2.get_supported_compute_types("cpu")
+if "int8" in _SUPPORTED_COMPUTE_TYPES:
+    logger.info("int8 compute type is hardware-accelerated on this CPU")
+else:
+    logger.warning(
+        "int8 compute type is not hardware-accelerated on this CPU, supported types: %s",
+        sorted(_SUPPORTED_COMPUTE_TYPES),
+    )
+
+
+def create_assemblyai_client() -> aai.Client:
+    """
+    Creates an AssemblyAI client whose HTTP connection pool is sized for concurrent uploads and polling.
 
+    The SDK client is built with default httpx settings, so its HTTP client is replaced by one keeping up to
+    ASSEMBLYAI_MAX_CONNECTIONS connections alive and retrying failed connection attempts.
 
-class AudioTranscriber(ABC):
+    Returns:
+        assemblyai.Client: The AssemblyAI client.
+    """
+    client = aai.Client(settings=aai.settings)
+    client._http_client = httpx.Client(
+        base_url=client.settings.base_url,
+        headers={"authorization": client.settings.api_key},
+        timeout=client.settings.http_timeout,
+        transport=httpx.HTTPTransport(
+            limits=httpx.Limits(
+                max_connections=ASSEMBLYAI_MAX_CONNECTIONS,
+                max_keepalive_connections=ASSEMBLYAI_MAX_CONNECTIONS,
+            ),
+            retries=2,
+        ),
+    )
+    return client
+
+
+class AudioTranscriber(Protocol):
     """
     A class for transcribing audio files.
 
-    This class provides an abstract interface for transcribing audio files
+    This protocol provides a structural interface for transcribing audio files
     in different languages.
+    The transcribers match it structurally and do not inherit from it, so
+    that they are plain classes without any metaclass machinery.
 
     Attributes:
         None
@@ -24,11 +76,6 @@ class AudioTranscriber(ABC):
 
     """
 
-    @abstractmethod
-    def __init__(self):
-        pass
-
-    @abstractmethod
     def transcribe(self, audio_file: str, language_code: Literal["en", "fr"]) -> str:
         """
         Transcribes an audio file.
@@ -40,15 +87,17 @@ class AudioTranscriber(ABC):
         Returns:
             str: The transcribed text.
         """
-        pass
+        ...
 
 
-class AsyncAudioTranscriber(ABC):
+class AsyncAudioTranscriber(Protocol):
     """
     A class for transcribing audio files asynchronously.
 
-    This class provides an abstract interface for transcribing audio files
+    This protocol provides a structural interface for transcribing audio files
     in different languages asynchronously.
+    The transcribers match it structurally and do not inherit from it, so
+    that they are plain classes without any metaclass machinery.
 
     Attributes:
         None
@@ -58,11 +107,6 @@ class AsyncAudioTranscriber(ABC):
 
     """
 
-    @abstractmethod
-    def __init__(self):
-        pass
-
-    @abstractmethod
     async def transcribe(
         self, audio_file: str, language_code: Literal["en", "fr"]
     ) -> str:
@@ -76,30 +120,32 @@ class AsyncAudioTranscriber(ABC):
         Returns:
             str: The transcribed text.
         """
-        pass
+        ...
 
 
-class WhisperTranscriber(AudioTranscriber):
+class WhisperTranscriber:
     """
     A class for transcribing audio files using the Whisper model.
 
     Attributes:
         model_name (str): The name of the Whisper model to use for transcription.
-        cpu_threads (int): Number of threads to use when running on CPU (4 by default). A non zero value overrides the OMP_NUM_THREADS environment variable.
+        cpu_threads (int): Number of threads to use when running on CPU (half the available cores by default, overridden by TRANSCRIBER_CPU_THREADS). A non zero value overrides the OMP_NUM_THREADS environment variable.
         num_workers (int): When transcribe() is called from multiple Python threads, having multiple workers enables true parallelism when running the model (concurrent calls to self.model.generate() will run in parallel). This can improve the global throughput at the cost of increased memory
+        compute_type (str): The CTranslate2 compute type used for inference ("int8" by default, overridden by TRANSCRIBER_COMPUTE_TYPE).
     """
 
     def __init__(self):
         self.model_name = os.getenv("TRANSCRIBER_MODEL_NAME", "base")
-        self.cpu_threads = 0
+        self.cpu_threads = TRANSCRIBER_CPU_THREADS
         self.num_workers = 1
+        self.compute_type = TRANSCRIBER_COMPUTE_TYPE
 
         self.transcriber = WhisperModel(
             self.model_name,
             device="cpu",
             cpu_threads=self.cpu_threads,
             num_workers=self.num_workers,
-            compute_type="int8",
+            compute_type=self.compute_type,
         )
 
     def transcribe(self, audio_file: str, language_code: Literal["en", "fr"]) -> str:
@@ -113,19 +159,60 @@ class WhisperTranscriber(AudioTranscriber):
         Returns:
             str: The transcribed text.
         """
-        start = time()
-        segments, _ = self.transcriber.transcribe(
-            audio_file, language=language_code, condition_on_previous_text=False
+        start = perf_counter()
+        text = transcribe_audio(self.transcriber, audio_file, language_code)
+        end = perf_counter()
+
+        logger.info("Time to transcribe audio: %.2fs", end - start)
+        return text.strip()
+
+
+class WhisperCppTranscriber:
+    """
+    A class for transcribing audio files using 4/5-bit quantized Whisper weights with whisper.cpp.
+
+    Attributes:
+        model_name (str): The name of the quantized ggml Whisper model to use for transcription.
+        models_dir (str): The directory of the ggml models (pywhispercpp's data directory by default, overridden by WHISPERCPP_MODELS_DIR).
+        cpu_threads (int): Number of threads to use when running on CPU (half the available cores by default, overridden by TRANSCRIBER_CPU_THREADS).
+    """
+
+    def __init__(self):
+        # Imported here so that the whisper.cpp bindings are only loaded when this backend is used
+        from pywhispercpp.model import Model as WhisperCppModel
+
+        self.model_name = os.getenv("WHISPERCPP_MODEL_NAME", "base-q5_1")
+        self.models_dir = os.getenv("WHISPERCPP_MODELS_DIR", None)
+        self.cpu_threads = TRANSCRIBER_CPU_THREADS
+
+        self.transcriber = WhisperCppModel(
+            self.model_name,
+            models_dir=self.models_dir,
+            n_threads=self.cpu_threads,
+            print_realtime=False,
+            print_progress=False,
         )
-        segments = [segment.text for segment in segments]
-        text = " ".join(segments)
-        end = time()
 
-        print(f"Time to transcribe audio: {end - start:.2f}s")
+    def transcribe(self, audio_file: str, language_code: Literal["en", "fr"]) -> str:
+        """
+        Transcribes an audio file.
+
+        Args:
+            audio_file (str): The path to the audio file.
+            language_code (Literal["en", "fr"]): The language code of the audio file.
+
+        Returns:
+            str: The transcribed text.
+        """
+        start = perf_counter()
+        text = transcribe_audio_cpp(self.transcriber, audio_file, language_code)
+        end = perf_counter()
+
+        logger.info("Time to transcribe audio: %.2fs", end - start)
         return text.strip()
 
 
-class AssemblyAITranscriber(AudioTranscriber):
+class AssemblyAITranscriber:
     """
     A class for transcribing audio files using the AssemblyAI API.
 
@@ -141,7 +228,10 @@ class AssemblyAITranscriber(AudioTranscriber):
         ), "ASSEMBLYAI_API_KEY environment variable is not set"
 
         aai.settings.api_key = self.api_key
-        self.transcriber = aai.Transcriber()
+        self.client = create_assemblyai_client()
+        self.transcriber = aai.Transcriber(
+            client=self.client, max_workers=ASSEMBLYAI_MAX_CONNECTIONS
+        )
 
     def transcribe(self, audio_file: str, language_code: Literal["en", "fr"]) -> str:
         """
@@ -158,10 +248,10 @@ class AssemblyAITranscriber(AudioTranscriber):
             language_code=language_code, punctuate=True, format_text=True
         )
 
-        start = time()
+        start = perf_counter()
         transcript = self.transcriber.transcribe(audio_file, config=config)
-        end = time()
-        print(f"Time to transcribe audio: {end - start:.2f}s")
+        end = perf_counter()
+        logger.info("Time to transcribe audio: %.2fs", end - start)
 
         if transcript.status == aai.TranscriptStatus.error:
             raise Exception(f"Transcription failed with error: {transcript.error}")
@@ -183,36 +273,67 @@ def transcribe_audio(
     Returns:
         str: The transcribed text.
     """
+    # Silent and music-only parts are skipped by the VAD and greedy decoding is
+    # enough for YouTube audio, both reduce the number of decoder passes
     segments, _ = transcriber.transcribe(
-        audio_file, language=language_code, condition_on_previous_text=False
+        audio_file,
+        language=language_code,
+        condition_on_previous_text=False,
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=500),
+        beam_size=1,
     )
-    segments = [segment.text for segment in segments]
-    text = " ".join(segments)
+    text = " ".join(segment.text for segment in segments)
+
+    return text
+
+
+def transcribe_audio_cpp(
+    transcriber, audio_file: str, language_code: Literal["en", "fr"]
+) -> str:
+    """
+    Transcribes an audio file with whisper.cpp.
+
+    The audio is decoded to 16kHz mono samples with PyAV (through faster-whisper) so that no ffmpeg binary is needed.
+
+    Args:
+        transcriber (pywhispercpp.model.Model): The whisper.cpp model transcriber.
+        audio_file (str): The path to the audio file.
+        language_code (Literal["en", "fr"]): The language code of the audio file.
+
+    Returns:
+        str: The transcribed text.
+    """
+    audio = decode_audio(audio_file, sampling_rate=16000)
+    segments = transcriber.transcribe(audio, language=language_code)
+    text = " ".join(segment.text for segment in segments)
 
     return text
 
 
-class AynscWhisperTranscriber(AsyncAudioTranscriber):
+class AynscWhisperTranscriber:
     """
     An asynchronous class for transcribing audio files using the Whisper model.
 
     Attributes:
         model_name (str): The name of the Whisper model to use for transcription.
-        cpu_threads (int): Number of threads to use when running on CPU (4 by default). A non zero value overrides the OMP_NUM_THREADS environment variable.
+        cpu_threads (int): Number of threads to use when running on CPU (half the available cores by default, overridden by TRANSCRIBER_CPU_THREADS). A non zero value overrides the OMP_NUM_THREADS environment variable.
         num_workers (int): When transcribe() is called from multiple Python threads, having multiple workers enables true parallelism when running the model (concurrent calls to self.model.generate() will run in parallel). This can improve the global throughput at the cost of increased memory
+        compute_type (str): The CTranslate2 compute type used for inference ("int8" by default, overridden by TRANSCRIBER_COMPUTE_TYPE).
     """
 
     def __init__(self):
         self.model_name = os.getenv("TRANSCRIBER_MODEL_NAME", "base")
-        self.cpu_threads = 0
-        self.num_workers = 1
+        self.cpu_threads = TRANSCRIBER_CPU_THREADS
+        self.num_workers = WHISPER_WORKERS
+        self.compute_type = TRANSCRIBER_COMPUTE_TYPE
 
         self.transcriber = WhisperModel(
             self.model_name,
             device="cpu",
             cpu_threads=self.cpu_threads,
             num_workers=self.num_workers,
-            compute_type="int8",
+            compute_type=self.compute_type,
         )
 
     async def transcribe(
@@ -228,19 +349,18 @@ class AynscWhisperTranscriber(AsyncAudioTranscriber):
         Returns:
             str: The transcribed text.
         """
-        start = time()
+        start = perf_counter()
         loop = asyncio.get_running_loop()
-        with ProcessPoolExecutor() as executor:
-            text = await loop.run_in_executor(
-                executor, transcribe_audio, self.transcriber, audio_file, language_code
-            )
-        end = time()
-        print(f"Time to transcribe audio: {end - start:.2f}s")
+        text = await loop.run_in_executor(
+            _WHISPER_POOL, transcribe_audio, self.transcriber, audio_file, language_code
+        )
+        end = perf_counter()
+        logger.info("Time to transcribe audio: %.2fs", end - start)
 
         return text.strip()
 
 
-class AsyncAssemblyAITranscriber(AsyncAudioTranscriber):
+class AsyncAssemblyAITranscriber:
     """
     An asynchronous class for transcribing audio files using the AssemblyAI API.
 
@@ -256,7 +376,10 @@ class AsyncAssemblyAITranscriber(AsyncAudioTranscriber):
         ), "ASSEMBLYAI_API_KEY environment variable is not set"
 
         aai.settings.api_key = self.api_key
-        self.transcriber = aai.Transcriber()
+        self.client = create_assemblyai_client()
+        self.transcriber = aai.Transcriber(
+            client=self.client, max_workers=ASSEMBLYAI_MAX_CONNECTIONS
+        )
 
     async def transcribe(
         self, audio_file: str, language_code: Literal["en", "fr"]
@@ -275,14 +398,70 @@ class AsyncAssemblyAITranscriber(AsyncAudioTranscriber):
             language_code=language_code, punctuate=True, format_text=True
         )
 
-        start = time()
+        start = perf_counter()
         future = self.transcriber.transcribe_async(audio_file, config=config)
         asyncio_future = asyncio.wrap_future(future)
         transcript = await asyncio_future
-        end = time()
-        print(f"Time to transcribe audio: {end - start:.2f}s")
+        end = perf_counter()
+        logger.info("Time to transcribe audio: %.2fs", end - start)
 
         if transcript.status == aai.TranscriptStatus.error:
             raise Exception(f"Transcription failed with error: {transcript.error}")
 
         return transcript.text.strip()
+
+
+class AsyncWhisperCppTranscriber:
+    """
+    An asynchronous class for transcribing audio files using 4/5-bit quantized Whisper weights with whisper.cpp.
+
+    Attributes:
+        model_name (str): The name of the quantized ggml Whisper model to use for transcription.
+        models_dir (str): The directory of the ggml models (pywhispercpp's data directory by default, overridden by WHISPERCPP_MODELS_DIR).
+        cpu_threads (int): Number of threads to use when running on CPU (half the available cores by default, overridden by TRANSCRIBER_CPU_THREADS).
+    """
+
+    def __init__(self):
+        # Imported here so that the whisper.cpp bindings are only loaded when this backend is used
+        from pywhispercpp.model import Model as WhisperCppModel
+
+        self.model_name = os.getenv("WHISPERCPP_MODEL_NAME", "base-q5_1")
+        self.models_dir = os.getenv("WHISPERCPP_MODELS_DIR", None)
+        self.cpu_threads = TRANSCRIBER_CPU_THREADS
+
+        self.transcriber = WhisperCppModel(
+            self.model_name,
+            models_dir=self.models_dir,
+            n_threads=self.cpu_threads,
+            print_realtime=False,
+            print_progress=False,
+        )
+
+    async def transcribe(
+        self, audio_file: str, language_code: Literal["en", "fr"]
+    ) -> str:
+        """
+        Transcribes an audio file asynchronously.
+
+        A whisper.cpp context cannot run concurrent inferences, so calls are serialized on a single worker thread.
+
+        Args:
+            audio_file (str): The path to the audio file.
+            language_code (Literal["en", "fr"]): The language code of the audio file.
+
+        Returns:
+            str: The transcribed text.
+        """
+        start = perf_counter()
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(
+            _WHISPERCPP_POOL,
+            transcribe_audio_cpp,
+            self.transcriber,
+            audio_file,
+            language_code,
+        )
+        end = perf_counter()
+        logger.info("Time to transcribe audio: %.2fs", end - start)
+
+        return text.strip()
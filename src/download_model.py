@@ -1,5 +1,32 @@
 import os
-from faster_whisper import WhisperModel
+from faster_whisper.utils import download_model as download_whisper_model
+from pywhispercpp.utils import download_model
+
+
+def is_whisper_model_cached(model_name):
+    """
+    Checks whether the CTranslate2 Whisper model is already in the local Hugging Face cache.
+
+    Args:
+        model_name (str): The name of the Whisper model.
+
+    Returns:
+        bool: True if the model weights are cached, False otherwise.
+    """
+    try:
+        model_path = download_whisper_model(model_name, local_files_only=True)
+    except FileNotFoundError:
+        return False
+    return os.path.isfile(os.path.join(model_path, "model.bin"))
+
 
 model_name = os.getenv("TRANSCRIBER_MODEL_NAME", "base")
-transcriber = WhisperModel(model_name)
\ No newline at end of file
+if is_whisper_model_cached(model_name):
+    print(f"Whisper model {model_name} already downloaded")
+else:
+    download_whisper_model(model_name)
+
+# pywhispercpp skips the download when the ggml file is already present, the fixed
+# directory keeps the model readable by the user running the app
+whispercpp_model_name = os.getenv("WHISPERCPP_MODEL_NAME", "base-q5_1")
+download_model(whispercpp_model_name, os.getenv("WHISPERCPP_MODELS_DIR", None))
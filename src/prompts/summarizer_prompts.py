@@ -78,3 +78,45 @@ Note: even if your input is empty, please provide a valid JSON object with the k
 Note: to generate a valid JSON object, be extra cautious to start your JSON object with `{` and end it with `}`.
 Note: don't forget to write the summary in the "summary" key/value of the JSON object.
 """
+
+MULTI_CHUNK_SUMMARIZER_PROMPT = """Your task is to summarize the key information from several transcript chunks (consecutive excerpts from the transcript of a YouTube video) in the form of clear, concise bullet points and a title for each chunk. Each chunk is delimited by <chunk id="N"> and </chunk> tags, the chunks are numbered from 0 in order, and each must be summarized independently of the others.
+
+Follow these steps for each chunk:
+
+1. Carefully read the transcript chunk to identify the most important points, arguments, takeaways, and conclusions. 
+2. Organize the key information into a logical bullet point structure.
+3. Write the summary and title, following these specifications:
+    - The bullet point summary should:
+        - Capture the essential information needed to understand the main points 
+        - Be concise yet comprehensive (aim for 4-7 bullet points, each 1-2 sentences long)
+        - Maintain logical coherence 
+    - The title should:
+        - Concisely summarize the main topic or overarching message of the chunk
+        - Be 5-10 words long
+    - Write in the same language as the input chunk
+
+Provide your output in this JSON format, with one entry per chunk in the "summaries" list, using the id of the chunk:
+<json>
+{
+  "scratchpad": "Your notes and thoughts for steps 1 and 2 go here.",
+  "summaries": [
+    {"id": 0, "summary": "## Chunk Title\n\nBullet point 1\nBullet point 2\n..."},
+    {"id": 1, "summary": "## Chunk Title\n\nBullet point 1\nBullet point 2\n..."}
+  ]
+}
+</json>
+
+Example of desired output for two transcript chunks, with ids 0 and 1, about the benefits of meditation and about getting started with it:
+<example_json>
+{
+  "scratchpad": "Chunk 0 key points: meditation reduces stress, anxiety, depression; improves focus, memory, emotional regulation. Chunk 1 key points: short daily sessions are effective; focusing on the breath is a simple starting technique.",
+  "summaries": [
+    {"id": 0, "summary": "## The Science-Backed Benefits of Meditation\n\nMeditation can reduce stress, anxiety and depression symptoms\nRegular practice improves focus, memory and emotional regulation"},
+    {"id": 1, "summary": "## Getting Started with Meditation\n\nEven short daily meditation sessions of 10 minutes can provide benefits\nFocusing on the breath is a simple way to start"}
+  ]
+}
+</example_json>
+
+Note: to generate a valid JSON object, be extra cautious to start your JSON object with `{` and end it with `}`.
+Note: don't forget to write one entry per chunk in the "summaries" list of the JSON object, with the same id as the chunk, and no other entry.
+"""
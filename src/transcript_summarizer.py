@@ -1,27 +1,232 @@
-from groq import Groq, AsyncGroq, BadRequestError
+from groq import (
+    AsyncGroq,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+import httpx
 from pydantic import BaseModel, ValidationError
 from json_repair import repair_json
+from tenacity import (
+    AsyncRetrying,
+    before_sleep_log,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
 import re
 import os
+import json
+import weakref
+import functools
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import List
-
+import hashlib
+import logging
+from typing import List, Optional
+
+from src.utils.rate_limiter import (
+    TokenBucket,
+    GROQ_RATE_LIMITS,
+    DEFAULT_GROQ_RATE_LIMITS,
+)
 from src.prompts.summarizer_prompts import (
     CHUNK_SUMMARIZER_PROMPT,
+    MULTI_CHUNK_SUMMARIZER_PROMPT,
     SUMMARIES_MERGER_PROMPT,
 )
 
+logger = logging.getLogger(__name__)
+
+
+# The system prompts never change, so their messages are built once and shared by every request
+CHUNK_SUMMARIZER_MESSAGE = {"role": "system", "content": CHUNK_SUMMARIZER_PROMPT}
+SUMMARIES_MERGER_MESSAGE = {"role": "system", "content": SUMMARIES_MERGER_PROMPT}
+MULTI_CHUNK_SUMMARIZER_MESSAGE = {
+    "role": "system",
+    "content": MULTI_CHUNK_SUMMARIZER_PROMPT,
+}
+
+# Cached summaries are invalidated whenever a prompt changes
+CHUNK_SUMMARIZER_PROMPT_VERSION = hashlib.blake2b(
+    CHUNK_SUMMARIZER_PROMPT.encode("utf-8"), digest_size=8
+).hexdigest()
+SUMMARIES_MERGER_PROMPT_VERSION = hashlib.blake2b(
+    SUMMARIES_MERGER_PROMPT.encode("utf-8"), digest_size=8
+).hexdigest()
+MULTI_CHUNK_SUMMARIZER_PROMPT_VERSION = hashlib.blake2b(
+    MULTI_CHUNK_SUMMARIZER_PROMPT.encode("utf-8"), digest_size=8
+).hexdigest()
+PARAGRAPH_SEPARATOR_REGEX = re.compile(r"\n{2,}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_field_regex(field: str) -> re.Pattern:
+    """
+    Get the pattern matching a JSON string field once its value has been closed, capturing the JSON string.
+
+    Args:
+        field (str): The name of the field.
+
+    Returns:
+        re.Pattern: The compiled pattern, to be matched from the opening quote of the field name.
+    """
+    return re.compile(rf'"{re.escape(field)}"\s*:\s*("(?:[^"\\]|\\.)*")', re.DOTALL)
+
+
+SUMMARY_FIELD_REGEX = get_field_regex("summary")
+
+GROQ_API_URL = "https://api.groq.com/openai/v1"
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+SUMMARY_CACHE_PREFIX = "sum:"
+SUMMARY_CACHE_TTL = 86400
+
+# Rate limits and transient server or network failures are retried, bad requests are not. The SDK only
+# wraps the failures sending the request, those reading the stream are raised as plain httpx errors
+RETRYABLE_GROQ_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    httpx.TransportError,
+)
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "5"))
+MAX_RETRY_AFTER = 60
+
+
+# Connections and pool locks belong to the event loop that created them, so the clients are
+# shared by the summarizers running on the same loop only (e.g. each sync summarizer has its own)
+_http_clients = weakref.WeakKeyDictionary()
+_groq_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the HTTP/2 connection pool shared by all the calls to the language model API made from the running event loop.
+
+    Returns:
+        httpx.AsyncClient: The shared HTTP client.
+    """
+    loop = asyncio.get_running_loop()
+    http_client = _http_clients.get(loop)
+    if http_client is None:
+        pool_size = int(os.getenv("GROQ_POOL_SIZE", "100"))
+        http_client = _http_clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=60,
+            ),
+            http2=True,
+            timeout=60,
+        )
+    return http_client
+
+
+def get_async_groq(api_key: str) -> AsyncGroq:
+    """
+    Get the Groq client for an API key, shared by all the summarizers using that key on the running event loop.
+
+    Args:
+        api_key (str): The Groq API key.
+
+    Returns:
+        AsyncGroq: The shared Groq client.
+    """
+    groq_clients = _groq_clients.setdefault(asyncio.get_running_loop(), {})
+    if api_key not in groq_clients:
+        # Retries are handled around the whole streamed generation, see wait_groq_retry
+        groq_clients[api_key] = AsyncGroq(
+            api_key=api_key, max_retries=0, http_client=get_http_client()
+        )
+    return groq_clients[api_key]
+
+
+_exponential_jitter_wait = wait_exponential_jitter(initial=1, max=30)
+
+
+def wait_groq_retry(retry_state) -> float:
+    """
+    Compute how long to wait before retrying a failed call to the Groq API.
+
+    The Retry-After header sent along with rate limit errors is honored when present,
+    other failures are retried with an exponential backoff with jitter.
+
+    Args:
+        retry_state (tenacity.RetryCallState): The state of the retried call.
+
+    Returns:
+        float: The number of seconds to wait.
+    """
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    if response is not None:
+        try:
+            return min(float(response.headers["retry-after"]), MAX_RETRY_AFTER)
+        except (KeyError, ValueError):
+            pass
+    return _exponential_jitter_wait(retry_state)
+
+
+async def close_clients() -> None:
+    """
+    Close the HTTP connection pool of the running event loop and forget the clients built on top of it.
+
+    The clients of the other event loops are left untouched.
+    """
+    loop = asyncio.get_running_loop()
+    _groq_clients.pop(loop, None)
+    http_client = _http_clients.pop(loop, None)
+    if http_client is not None:
+        await http_client.aclose()
+
 
 class ResponseModel(BaseModel):
-    scratchpad: str
+    # The scratchpad may be cut off when the stream is closed right after the summary
+    scratchpad: str = ""
+    summary: str
+
+
+class ChunkSummaryModel(BaseModel):
+    id: int
     summary: str
 
 
+class MultiChunkResponseModel(BaseModel):
+    scratchpad: str = ""
+    summaries: List[ChunkSummaryModel]
+
+
+def parse_response(model: type[BaseModel], content: str) -> BaseModel:
+    """
+    Parse a JSON response of the language model into a pydantic model.
+
+    Valid JSON is decoded by the C json parser, the slower repair is only attempted when it fails,
+    e.g. on outputs cut off by max_tokens or wrapped in extra text.
+
+    Args:
+        model (type): The pydantic model of the response.
+        content (str): The raw output of the language model.
+
+    Returns:
+        BaseModel: The parsed response.
+
+    Raises:
+        pydantic.ValidationError: If even the repaired output does not match the model.
+    """
+    try:
+        return model.model_validate(json.loads(content))
+    except (json.JSONDecodeError, ValidationError):
+        return model.model_validate(repair_json(content, return_objects=True))
+
+
 class TranscriptSummarizer:
     """
     A class for summarizing long YouTube video transcriptions using calls to large language model APIs.
+
+    This is a synchronous wrapper around AsyncTranscriptSummarizer, the chunks are summarized concurrently
+    on a dedicated event loop that is kept alive between calls so the HTTP connections to the API are reused.
     """
 
     def __init__(self, max_chunk_size=1000):
@@ -29,18 +234,10 @@ class TranscriptSummarizer:
         Initialize the TranscriptSummarizer.
 
         Args:
-            api_key (str): The API key required for authentication with the language model API.
-            api_url (str): The URL of the language model API endpoint for summarization.
             max_chunk_size (int, optional): The maximum size of each chunk in characters. Default is 1000.
         """
-        self.api_key = os.getenv("GROQ_API_KEY", None)
-        assert self.api_key, "GROQ_API_KEY environment variable is not set"
-        self.client = Groq(
-            api_key=self.api_key,
-        )
-        self.model_name = os.getenv("SUMMARIZER_MODEL_NAME", "llama3-8b-8192")
-        self.max_chunk_size = max_chunk_size
-        self.max_tokens = 8000
+        self.summarizer = AsyncTranscriptSummarizer(max_chunk_size=max_chunk_size)
+        self.runner = asyncio.Runner()
 
     def split_in_chunks(self, transcript: str) -> List[str]:
         """
@@ -52,21 +249,7 @@ class TranscriptSummarizer:
         Returns:
             list: A list of strings, where each string represents a chunk of the transcript.
         """
-        paragraphs = re.split(r"\n{2,}", transcript)
-        chunks = []
-        current_chunk = ""
-
-        for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) + 1 <= self.max_chunk_size:
-                current_chunk += paragraph + "\n\n"
-            else:
-                chunks.append(current_chunk.strip())
-                current_chunk = paragraph + "\n\n"
-
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-
-        return [chunk for chunk in chunks if chunk]
+        return self.summarizer.split_in_chunks(transcript)
 
     def summarize_chunk(self, chunk: str, language) -> str:
         """
@@ -77,42 +260,8 @@ class TranscriptSummarizer:
 
         Returns:
             str: The summary of the given chunk.
-
-        Raises:
-            requests.exceptions.RequestException: If there is an error with the API request.
         """
-        try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": CHUNK_SUMMARIZER_PROMPT,
-                    },
-                    {
-                        "role": "user",
-                        "content": "<chunk>\n\n" + chunk + "\n\n</chunk>",
-                    },
-                ],
-                model=self.model_name,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"},
-            )
-            print(chat_completion.choices[0].message.content)
-            response = ResponseModel.model_validate_json(
-                chat_completion.choices[0].message.content
-            )
-        except BadRequestError as e:
-            repaired_json_dict = repair_json(
-                e.body["error"]["failed_generation"], return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
-        except ValidationError:
-            repaired_json_dict = repair_json(
-                chat_completion.choices[0].message.content, return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
-
-        return response.summary
+        return self.runner.run(self.summarizer.summarize_chunk(chunk, language))
 
     def merge_summaries(self, summaries: List[str]) -> str:
         """
@@ -124,41 +273,7 @@ class TranscriptSummarizer:
         Returns:
             str: The final summary of the entire transcript.
         """
-        try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": SUMMARIES_MERGER_PROMPT,
-                    },
-                    {
-                        "role": "user",
-                        "content": "<summaries>\n\n"
-                        + "\n\n".join(summaries)
-                        + "\n\n</summaries>",
-                    },
-                ],
-                model=self.model_name,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"},
-            )
-
-            print(chat_completion.choices[0].message.content)
-            response = ResponseModel.model_validate_json(
-                chat_completion.choices[0].message.content
-            )
-        except BadRequestError as e:
-            repaired_json_dict = repair_json(
-                e.body["error"]["failed_generation"], return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
-        except ValidationError:
-            repaired_json_dict = repair_json(
-                chat_completion.choices[0].message.content, return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
-
-        return response.summary
+        return self.runner.run(self.summarizer.merge_summaries(summaries))
 
     def summarize(self, transcript: str, language) -> str:
         """
@@ -170,22 +285,14 @@ class TranscriptSummarizer:
         Returns:
             str: The final summary of the entire transcript.
         """
-        print("Summarizing the transcript")
+        return self.runner.run(self.summarizer.summarize(transcript, language))
 
-        chunks = self.split_in_chunks(transcript)
-
-        print(f"Summarizing {len(chunks)} chunks separately")
-        with ThreadPoolExecutor() as executor:
-            summaries = list(
-                executor.map(
-                    lambda chunk: self.summarize_chunk(chunk, language), chunks
-                )
-            )
-
-        print("Merging the summaries chunks into ")
-        final_summary = self.merge_summaries(summaries)
-
-        return final_summary
+    def close(self) -> None:
+        """
+        Close the HTTP connections to the language model API and the underlying event loop.
+        """
+        self.runner.run(self.summarizer.close())
+        self.runner.close()
 
 
 class AsyncTranscriptSummarizer:
@@ -193,25 +300,267 @@ class AsyncTranscriptSummarizer:
     A class for summarizing long YouTube video transcriptions asynchronously using calls to large language model APIs.
     """
 
-    def __init__(self, max_chunk_size=1000):
+    def __init__(self, max_chunk_size=1000, redis_client=None):
         """
         Initialize the TranscriptSummarizer.
 
         Args:
-            api_key (str): The API key required for authentication with the language model API.
-            api_url (str): The URL of the language model API endpoint for summarization.
             max_chunk_size (int, optional): The maximum size of each chunk in characters. Default is 1000.
+            redis_client (redis.asyncio.Redis, optional): The Redis client used to cache the chunk and merged summaries. Default is None, which disables the cache.
         """
+        self.redis_client = redis_client
         self.api_key = os.getenv("GROQ_API_KEY", None)
         assert self.api_key, "GROQ_API_KEY environment variable is not set"
-        self.client = AsyncGroq(
-            api_key=self.api_key,
-        )
         self.model_name = os.getenv("SUMMARIZER_MODEL_NAME", "llama3-8b-8192")
         self.max_chunk_size = max_chunk_size
         self.max_tokens = 8000
+        # The API reserves room for the whole max_tokens budget of a request while it is being decoded,
+        # so the budget follows the input size (about 3 characters per token) to leave room for batching
+        # it with other requests, the floors leave room for the scratchpad written before the summary
+        self.min_chunk_output_tokens = 512
+        self.max_chunk_output_tokens = 1024
+        self.min_merge_output_tokens = 1024
+        # Small adjacent chunks are packed into a single request, as long as the stacked
+        # outputs stay short enough for the saved round trips to outweigh the longer decode
+        self.target_prompt_tokens = 3000
+        self.max_packed_output_tokens = 800
+        self.estimated_chunk_summary_tokens = 160
+
+        rpm, tpm = GROQ_RATE_LIMITS.get(self.model_name, DEFAULT_GROQ_RATE_LIMITS)
+        self.semaphore = asyncio.Semaphore(int(os.getenv("GROQ_MAX_CONCURRENCY", "8")))
+        self.rate_limiter = TokenBucket(
+            rpm=int(os.getenv("GROQ_RPM", rpm)), tpm=int(os.getenv("GROQ_TPM", tpm))
+        )
+
+    def get_max_tokens(self, input_size: int, min_tokens: int, max_tokens: int) -> int:
+        """
+        Derive the output token budget of a request from the size of its input.
+
+        Args:
+            input_size (int): The size of the summarized content in characters.
+            min_tokens (int): The smallest budget allowed.
+            max_tokens (int): The largest budget allowed.
+
+        Returns:
+            int: The maximum number of tokens to generate.
+        """
+        return max(min_tokens, min(max_tokens, input_size // 3))
+
+    async def generate(self, messages, max_tokens=None, stop_field=None) -> str:
+        """
+        Stream a JSON response from the chat completion API while staying within the concurrency and rate limits.
+
+        Rate limit errors and transient server or network failures are retried, up to GROQ_MAX_RETRIES times.
+        Other API errors, such as bad requests, are raised as is.
+
+        Args:
+            messages (list): The messages to send to the language model.
+            max_tokens (int, optional): The maximum number of tokens to generate. Default is None, which uses max_tokens.
+            stop_field (str, optional): The stream is closed as soon as the string value of this JSON field is complete. Default is None.
+
+        Returns:
+            str: The raw output of the language model.
+        """
+        # The backoff happens outside of the semaphore, so waiting calls don't hold back the others
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(RETRYABLE_GROQ_ERRORS),
+            wait=wait_groq_retry,
+            stop=stop_after_attempt(GROQ_MAX_RETRIES + 1),
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True,
+        ):
+            with attempt:
+                content = await self._stream_completion(
+                    messages, max_tokens or self.max_tokens, stop_field
+                )
+
+        logger.debug("groq response: %s", content)
+        return content
+
+    async def _stream_completion(self, messages, max_tokens, stop_field=None) -> str:
+        """
+        Stream a single chat completion, the whole output is requested again if the stream fails midway.
+
+        Args:
+            messages (list): The messages to send to the language model.
+            max_tokens (int): The maximum number of tokens to generate.
+            stop_field (str, optional): The stream is closed as soon as the string value of this JSON field is complete. Default is None.
+
+        Returns:
+            str: The raw output of the language model.
+        """
+        # Roughly 4 characters per token
+        estimated_tokens = sum(len(message["content"]) for message in messages) // 4
+
+        if stop_field:
+            stop_key = f'"{stop_field}"'
+            stop_regex = get_field_regex(stop_field)
+        # The output from the stop field on, or its last characters while the field has not been
+        # seen yet, so that checking for the end of the field never rescans the whole output
+        tail = ""
+        field_found = False
+
+        parts = []
+        async with self.semaphore:
+            await self.rate_limiter.acquire(estimated_tokens)
+            # Groq's JSON mode does not support streaming, the prompts already ask for a JSON object
+            stream = await self.client.chat.completions.create(
+                messages=messages,
+                model=self.model_name,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+            async with stream:
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    if not stop_field:
+                        continue
+
+                    tail += delta
+                    if not field_found:
+                        key_position = tail.find(stop_key)
+                        if key_position < 0:
+                            tail = tail[-(len(stop_key) - 1) :]
+                            continue
+                        field_found = True
+                        tail = tail[key_position:]
+                    if '"' in delta and stop_regex.match(tail):
+                        break
+
+        return "".join(parts)
+
+    async def generate_summary(self, messages, max_tokens=None) -> str:
+        """
+        Stream a summary from the chat completion API.
+
+        The stream is closed as soon as the "summary" field of the JSON response is complete, so the object is
+        never closed and the summary string is decoded on its own. Other outputs are parsed (and repaired if
+        needed) into a ResponseModel.
+
+        Args:
+            messages (list): The messages to send to the language model.
+            max_tokens (int, optional): The maximum number of tokens to generate. Default is None, which uses max_tokens.
+
+        Returns:
+            str: The generated summary.
+        """
+        content = await self.generate(
+            messages, max_tokens=max_tokens, stop_field="summary"
+        )
+        match = SUMMARY_FIELD_REGEX.search(content)
+        if match:
+            try:
+                # Language models often write raw newlines inside JSON strings
+                return json.loads(match.group(1), strict=False)
+            except json.JSONDecodeError:
+                pass
+        return parse_response(ResponseModel, content).summary
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return get_http_client()
+
+    @property
+    def client(self) -> AsyncGroq:
+        return get_async_groq(self.api_key)
+
+    async def close(self) -> None:
+        """
+        Close the HTTP connections to the language model API.
+
+        The connections are shared by all the summarizers running on the same event loop, which will open a new pool on their next call.
+        """
+        await close_clients()
+
+    async def prewarm(self) -> None:
+        """
+        Open a connection to the language model API ahead of the first summarization call.
+
+        Failures are ignored since the actual summarization calls will surface any API error.
+        """
+        try:
+            await self.client.models.retrieve(self.model_name)
+        except Exception as e:
+            logger.warning("Summarizer prewarm failed: %s", e)
+
+    def get_cache_key(self, prompt_version: str, content: str) -> str:
+        """
+        Build the cache key of a summary from the model, the prompt version and the summarized content.
+
+        Args:
+            prompt_version (str): The version of the prompt used to generate the summary.
+            content (str): The summarized content.
+
+        Returns:
+            str: The cache key of the summary.
+        """
+        content_hash = hashlib.blake2b(
+            f"{prompt_version}:{content}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+        return f"{SUMMARY_CACHE_PREFIX}{self.model_name}:{content_hash}"
+
+    async def get_cached_summary(self, cache_key: str) -> Optional[str]:
+        """
+        Retrieve a previously generated summary from the cache.
+
+        Args:
+            cache_key (str): The cache key of the summary.
+
+        Returns:
+            str or None: The cached summary, or None if it is not cached.
+        """
+        if self.redis_client is None:
+            return None
+        cached_summary = await self.redis_client.get(cache_key)
+        return cached_summary.decode("utf-8") if cached_summary else None
+
+    async def cache_summary(self, cache_key: str, summary: str) -> None:
+        """
+        Store a generated summary in the cache.
+
+        Args:
+            cache_key (str): The cache key of the summary.
+            summary (str): The summary to cache.
+        """
+        if self.redis_client is not None:
+            await self.redis_client.set(cache_key, summary, ex=SUMMARY_CACHE_TTL)
+
+    async def get_cached_summaries(self, cache_keys: List[str]) -> List[Optional[str]]:
+        """
+        Retrieve several previously generated summaries from the cache in a single round trip.
+
+        Args:
+            cache_keys (list): The cache keys of the summaries.
+
+        Returns:
+            list: The cached summaries, with None for the summaries that are not cached.
+        """
+        if self.redis_client is None or not cache_keys:
+            return [None] * len(cache_keys)
+        cached_summaries = await self.redis_client.mget(cache_keys)
+        return [
+            cached_summary.decode("utf-8") if cached_summary else None
+            for cached_summary in cached_summaries
+        ]
+
+    async def cache_summaries(self, summaries: dict) -> None:
+        """
+        Store several generated summaries in the cache in a single round trip.
 
-    async def split_in_chunks(self, transcript: str) -> List[str]:
+        Args:
+            summaries (dict): The summaries to cache, keyed by their cache key.
+        """
+        if self.redis_client is None or not summaries:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key, summary in summaries.items():
+                pipe.set(cache_key, summary, ex=SUMMARY_CACHE_TTL)
+            await pipe.execute()
+
+    def split_in_chunks(self, transcript: str) -> List[str]:
         """
         Split the transcript into smaller chunks based on the max_chunk_size.
 
@@ -221,21 +570,28 @@ class AsyncTranscriptSummarizer:
         Returns:
             list: A list of strings, where each string represents a chunk of the transcript.
         """
-        paragraphs = re.split(r"\n{2,}", transcript)
         chunks = []
-        current_chunk = ""
+        current_chunk = []
+        current_size = 0
 
-        for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) + 1 <= self.max_chunk_size:
-                current_chunk += paragraph + "\n\n"
+        for paragraph in PARAGRAPH_SEPARATOR_REGEX.split(transcript):
+            if current_size + len(paragraph) + 1 <= self.max_chunk_size:
+                current_chunk.append(paragraph)
+                current_size += len(paragraph) + 2
             else:
-                chunks.append(current_chunk.strip())
-                current_chunk = paragraph + "\n\n"
+                self._flush_chunk(chunks, current_chunk)
+                current_chunk = [paragraph]
+                current_size = len(paragraph) + 2
 
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        self._flush_chunk(chunks, current_chunk)
 
-        return [chunk for chunk in chunks if chunk]
+        return chunks
+
+    @staticmethod
+    def _flush_chunk(chunks: List[str], paragraphs: List[str]) -> None:
+        chunk = "\n\n".join(paragraphs).strip()
+        if chunk:
+            chunks.append(chunk)
 
     async def summarize_chunk(self, chunk: str, language) -> str:
         """
@@ -250,38 +606,159 @@ class AsyncTranscriptSummarizer:
         Raises:
             requests.exceptions.RequestException: If there is an error with the API request.
         """
-        try:
-            chat_completion = await self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": CHUNK_SUMMARIZER_PROMPT,
-                    },
+        cache_key = self.get_cache_key(CHUNK_SUMMARIZER_PROMPT_VERSION, chunk)
+        cached_summary = await self.get_cached_summary(cache_key)
+        if cached_summary is not None:
+            return cached_summary
+
+        summary = await self.generate_summary(
+            [
+                CHUNK_SUMMARIZER_MESSAGE,
+                {
+                    "role": "user",
+                    "content": "<chunk>\n\n" + chunk + "\n\n</chunk>",
+                },
+            ],
+            max_tokens=self.get_max_tokens(
+                len(chunk), self.min_chunk_output_tokens, self.max_chunk_output_tokens
+            ),
+        )
+
+        await self.cache_summary(cache_key, summary)
+        return summary
+
+    def pack_chunks(self, chunks: List[str]) -> List[List[str]]:
+        """
+        Group adjacent chunks into batches that are summarized with a single request.
+
+        Chunks longer than max_chunk_size (single paragraphs that could not be split) are always summarized alone.
+
+        Args:
+            chunks (list): The chunks of the transcript.
+
+        Returns:
+            list: A list of batches, where each batch is a list of consecutive chunks.
+        """
+        max_chunks_per_batch = max(
+            1, self.max_packed_output_tokens // self.estimated_chunk_summary_tokens
+        )
+        max_batch_size = self.target_prompt_tokens * 4
+
+        batches = []
+        current_batch = []
+        current_size = 0
+
+        for chunk in chunks:
+            if len(chunk) > self.max_chunk_size:
+                if current_batch:
+                    batches.append(current_batch)
+                batches.append([chunk])
+                current_batch = []
+                current_size = 0
+                continue
+
+            if current_batch and (
+                current_size + len(chunk) > max_batch_size
+                or len(current_batch) >= max_chunks_per_batch
+            ):
+                batches.append(current_batch)
+                current_batch = []
+                current_size = 0
+
+            current_batch.append(chunk)
+            current_size += len(chunk)
+
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
+
+    async def summarize_chunk_batch(self, chunks: List[str], language) -> List[str]:
+        """
+        Summarize a batch of chunks with a single request to the language model API.
+
+        Cached chunks are not sent again, and if the response does not summarize exactly the chunks that were
+        sent, all of them are summarized separately.
+        Summaries generated this way are cached under the version of the multi-chunk prompt, and chunks
+        summarized on their own are looked up as well.
+
+        Args:
+            chunks (list): The consecutive chunks of the transcript to be summarized.
+
+        Returns:
+            list: The summaries of the given chunks, in the same order.
+        """
+        if len(chunks) == 1:
+            return [await self.summarize_chunk(chunks[0], language)]
+
+        chunk_cache_keys = [
+            self.get_cache_key(CHUNK_SUMMARIZER_PROMPT_VERSION, chunk)
+            for chunk in chunks
+        ]
+        packed_cache_keys = [
+            self.get_cache_key(MULTI_CHUNK_SUMMARIZER_PROMPT_VERSION, chunk)
+            for chunk in chunks
+        ]
+        cached_summaries = await self.get_cached_summaries(
+            chunk_cache_keys + packed_cache_keys
+        )
+        summaries = [
+            chunk_summary if chunk_summary is not None else packed_summary
+            for chunk_summary, packed_summary in zip(
+                cached_summaries[: len(chunks)], cached_summaries[len(chunks) :]
+            )
+        ]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+
+        if len(missing) > 1:
+            # The chunks are numbered from 0 in the request, as in the examples of the prompt
+            content = await self.generate(
+                [
+                    MULTI_CHUNK_SUMMARIZER_MESSAGE,
                     {
                         "role": "user",
-                        "content": "<chunk>\n\n" + chunk + "\n\n</chunk>",
+                        "content": "\n\n".join(
+                            f'<chunk id="{chunk_id}">\n\n{chunks[i]}\n\n</chunk>'
+                            for chunk_id, i in enumerate(missing)
+                        ),
                     },
                 ],
-                model=self.model_name,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"},
-            )
-            print(chat_completion.choices[0].message.content)
-            response = ResponseModel.model_validate_json(
-                chat_completion.choices[0].message.content
+                max_tokens=self.get_max_tokens(
+                    sum(len(chunks[i]) for i in missing),
+                    self.min_chunk_output_tokens,
+                    self.max_tokens,
+                ),
             )
-        except BadRequestError as e:
-            repaired_json_dict = repair_json(
-                e.body["error"]["failed_generation"], return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
-        except ValidationError:
-            repaired_json_dict = repair_json(
-                chat_completion.choices[0].message.content, return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
+            try:
+                response = parse_response(MultiChunkResponseModel, content)
+            except ValidationError:
+                response = MultiChunkResponseModel(summaries=[])
+
+            # A response that skips, repeats or renumbers chunks could pair summaries with the wrong
+            # chunks, which the content-addressed cache would then keep, so it is only used as a whole
+            chunk_ids = sorted(chunk_summary.id for chunk_summary in response.summaries)
+            if chunk_ids == list(range(len(missing))):
+                new_summaries = {}
+                for chunk_summary in response.summaries:
+                    i = missing[chunk_summary.id]
+                    summaries[i] = chunk_summary.summary
+                    new_summaries[packed_cache_keys[i]] = chunk_summary.summary
+                await self.cache_summaries(new_summaries)
+            elif response.summaries:
+                logger.warning(
+                    "Packed summaries with ids %s do not match the %d chunks sent",
+                    chunk_ids,
+                    len(missing),
+                )
 
-        return response.summary
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        missing_summaries = await asyncio.gather(
+            *[self.summarize_chunk(chunks[i], language) for i in missing]
+        )
+        for i, summary in zip(missing, missing_summaries):
+            summaries[i] = summary
+
+        return summaries
 
     async def merge_summaries(self, summaries: List[str]) -> str:
         """
@@ -293,41 +770,30 @@ class AsyncTranscriptSummarizer:
         Returns:
             str: The final summary of the entire transcript.
         """
-        try:
-            chat_completion = await self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": SUMMARIES_MERGER_PROMPT,
-                    },
-                    {
-                        "role": "user",
-                        "content": "<summaries>\n\n"
-                        + "\n\n".join(summaries)
-                        + "\n\n</summaries>",
-                    },
-                ],
-                model=self.model_name,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"},
-            )
-
-            print(chat_completion.choices[0].message.content)
-            response = ResponseModel.model_validate_json(
-                chat_completion.choices[0].message.content
-            )
-        except BadRequestError as e:
-            repaired_json_dict = repair_json(
-                e.body["error"]["failed_generation"], return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
-        except ValidationError:
-            repaired_json_dict = repair_json(
-                chat_completion.choices[0].message.content, return_objects=True
-            )
-            response = ResponseModel.model_validate(repaired_json_dict)
+        # The summaries are joined once, and reused by both the cache key and the prompt
+        joined_summaries = "\n\n".join(summaries)
+        cache_key = self.get_cache_key(
+            SUMMARIES_MERGER_PROMPT_VERSION, joined_summaries
+        )
+        cached_summary = await self.get_cached_summary(cache_key)
+        if cached_summary is not None:
+            return cached_summary
+
+        summary = await self.generate_summary(
+            [
+                SUMMARIES_MERGER_MESSAGE,
+                {
+                    "role": "user",
+                    "content": f"<summaries>\n\n{joined_summaries}\n\n</summaries>",
+                },
+            ],
+            max_tokens=self.get_max_tokens(
+                len(joined_summaries), self.min_merge_output_tokens, self.max_tokens
+            ),
+        )
 
-        return response.summary
+        await self.cache_summary(cache_key, summary)
+        return summary
 
     async def summarize(self, transcript: str, language) -> str:
         """
@@ -339,17 +805,196 @@ class AsyncTranscriptSummarizer:
         Returns:
             str: The final summary of the entire transcript.
         """
-        print("Summarizing the transcript")
+        logger.info("Summarizing the transcript")
 
-        chunks = await self.split_in_chunks(transcript)
+        chunks = self.split_in_chunks(transcript)
 
-        print(f"Summarizing {len(chunks)} chunks separately")
-        chunk_coroutines = [
-            self.summarize_chunk(chunk, language) for chunk in chunks
+        batches = self.pack_chunks(chunks)
+
+        logger.info("Summarizing %d chunks in %d requests", len(chunks), len(batches))
+        batch_coroutines = [
+            self.summarize_chunk_batch(batch, language) for batch in batches
         ]
-        summaries = await asyncio.gather(*chunk_coroutines)
+        batch_summaries = await asyncio.gather(*batch_coroutines)
+        summaries = [summary for batch in batch_summaries for summary in batch]
 
-        print("Merging the summaries chunks into one summary")
+        logger.info("Merging the summaries chunks into one summary")
         final_summary = await self.merge_summaries(summaries)
 
         return final_summary
+
+    async def summarize_batch(self, transcripts: List[str]) -> List[str]:
+        """
+        Summarize several transcripts at once through the Batch API, for non-interactive use.
+
+        All the chunks of all the transcripts that are not cached yet are submitted as a single batch job, which
+        is billed at a discount and not subject to the real-time rate limits but can take up to 24 hours to complete.
+        Chunks that fail in the batch are summarized concurrently with the real-time API, as are the merged summaries.
+
+        Args:
+            transcripts (list): The full transcript texts to be summarized.
+
+        Returns:
+            list: The final summaries of the transcripts, in the same order.
+        """
+        chunks = [self.split_in_chunks(transcript) for transcript in transcripts]
+        cache_keys = [
+            [
+                self.get_cache_key(CHUNK_SUMMARIZER_PROMPT_VERSION, chunk)
+                for chunk in transcript_chunks
+            ]
+            for transcript_chunks in chunks
+        ]
+        cached_summaries = iter(
+            await self.get_cached_summaries(
+                [
+                    cache_key
+                    for transcript_keys in cache_keys
+                    for cache_key in transcript_keys
+                ]
+            )
+        )
+        summaries = [
+            [next(cached_summaries) for _ in transcript_chunks]
+            for transcript_chunks in chunks
+        ]
+
+        # Cached chunks are not submitted again
+        requests = [
+            {
+                "custom_id": f"{t}:{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model_name,
+                    "max_tokens": self.get_max_tokens(
+                        len(chunk),
+                        self.min_chunk_output_tokens,
+                        self.max_chunk_output_tokens,
+                    ),
+                    "response_format": {"type": "json_object"},
+                    "messages": [
+                        CHUNK_SUMMARIZER_MESSAGE,
+                        {
+                            "role": "user",
+                            "content": "<chunk>\n\n" + chunk + "\n\n</chunk>",
+                        },
+                    ],
+                },
+            }
+            for t, transcript_chunks in enumerate(chunks)
+            for i, chunk in enumerate(transcript_chunks)
+            if summaries[t][i] is None
+        ]
+
+        results = {}
+        if requests:
+            logger.info(
+                "Submitting %d chunks of %d transcripts as a batch job",
+                len(requests),
+                len(transcripts),
+            )
+            results = await self.run_batch(requests)
+
+        new_summaries = {}
+        for custom_id, content in results.items():
+            t, i = map(int, custom_id.split(":"))
+            try:
+                response = parse_response(ResponseModel, content)
+            except ValidationError:
+                continue
+            summaries[t][i] = response.summary
+            new_summaries[cache_keys[t][i]] = response.summary
+        await self.cache_summaries(new_summaries)
+
+        missing = [
+            (t, i)
+            for t, transcript_summaries in enumerate(summaries)
+            for i, summary in enumerate(transcript_summaries)
+            if summary is None
+        ]
+        missing_summaries = await asyncio.gather(
+            *[self.summarize_chunk(chunks[t][i], None) for t, i in missing]
+        )
+        for (t, i), summary in zip(missing, missing_summaries):
+            summaries[t][i] = summary
+
+        logger.info("Merging the summaries chunks of %d transcripts", len(transcripts))
+        return await asyncio.gather(
+            *[
+                self.merge_summaries(transcript_summaries)
+                for transcript_summaries in summaries
+            ]
+        )
+
+    async def run_batch(self, requests: List[dict]) -> dict:
+        """
+        Upload the requests as a JSONL file, run them as a batch job and wait for the results.
+
+        Args:
+            requests (list): The batch requests, each with a unique "custom_id".
+
+        Returns:
+            dict: The content of each successful response, keyed by its "custom_id".
+        """
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        jsonl = "\n".join(json.dumps(request) for request in requests).encode("utf-8")
+
+        response = await self.http_client.post(
+            f"{GROQ_API_URL}/files",
+            headers=headers,
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", jsonl, "application/jsonl")},
+        )
+        response.raise_for_status()
+        input_file_id = response.json()["id"]
+
+        response = await self.http_client.post(
+            f"{GROQ_API_URL}/batches",
+            headers=headers,
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h",
+            },
+        )
+        response.raise_for_status()
+        batch = response.json()
+
+        delay = 5
+        while batch["status"] not in BATCH_FINAL_STATUSES:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 300)
+            response = await self.http_client.get(
+                f"{GROQ_API_URL}/batches/{batch['id']}", headers=headers
+            )
+            response.raise_for_status()
+            batch = response.json()
+
+        logger.info(
+            "Batch job %s finished with status %s", batch["id"], batch["status"]
+        )
+        if not batch.get("output_file_id"):
+            return {}
+
+        response = await self.http_client.get(
+            f"{GROQ_API_URL}/files/{batch['output_file_id']}/content", headers=headers
+        )
+        response.raise_for_status()
+
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            body = (result.get("response") or {}).get("body") or {}
+            if result.get("error") or not body.get("choices"):
+                continue
+            # Refusals and filtered completions come back without any content, their
+            # chunks are left out and summarized with the real-time API instead
+            content = (body["choices"][0].get("message") or {}).get("content")
+            if not isinstance(content, str) or not content.strip():
+                continue
+            results[result["custom_id"]] = content
+
+        return results
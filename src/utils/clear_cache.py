@@ -1,9 +1,21 @@
 from redis import Redis
 
-def clear_cache():
-    r = Redis(host="redis-ytb-summarizer", port=6379, db=0)
+# Keys written by the app: chunk/merge summaries, video summaries and video transcripts
+CACHE_KEY_PATTERNS = ["sum:*", "*_summary", "*_transcript"]
 
-    r.execute_command('FLUSHALL ASYNC')
 
-if __name__ == '__main__':
-    clear_cache()
\ No newline at end of file
+def clear_cache(patterns=CACHE_KEY_PATTERNS):
+    r = Redis(host="redis-ytb-summarizer", port=6379, db=0, decode_responses=False)
+
+    # UNLINK frees the values in a background thread, and only the app's keys are touched
+    pipe = r.pipeline(transaction=False)
+    for pattern in patterns:
+        for key in r.scan_iter(match=pattern, count=1000):
+            pipe.unlink(key)
+            if len(pipe) >= 1000:
+                pipe.execute()
+    pipe.execute()
+
+
+if __name__ == "__main__":
+    clear_cache()
@@ -0,0 +1,67 @@
+import asyncio
+from time import monotonic
+
+
+# Default per-model (requests per minute, tokens per minute) limits of the Groq API
+GROQ_RATE_LIMITS = {
+    "llama3-8b-8192": (30, 30000),
+    "llama3-70b-8192": (30, 6000),
+    "mixtral-8x7b-32768": (30, 5000),
+    "gemma-7b-it": (30, 15000),
+}
+DEFAULT_GROQ_RATE_LIMITS = (30, 5000)
+
+
+class TokenBucket:
+    """
+    An asynchronous rate limiter enforcing both a requests per minute and a tokens per minute budget.
+
+    Both budgets refill continuously, callers wait until enough of each is available.
+
+    Attributes:
+        rpm (int): The maximum number of requests per minute.
+        tpm (int): The maximum number of tokens per minute.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.available_requests = float(rpm)
+        self.available_tokens = float(tpm)
+        self.updated_at = monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.available_requests = min(
+            self.rpm, self.available_requests + elapsed * self.rpm / 60
+        )
+        self.available_tokens = min(
+            self.tpm, self.available_tokens + elapsed * self.tpm / 60
+        )
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Waits until one request and the given number of tokens can be spent, then spends them.
+
+        Args:
+            tokens (int): The estimated number of tokens used by the request.
+        """
+        # A request larger than the whole budget would otherwise wait forever
+        tokens = min(tokens, self.tpm)
+
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.available_requests >= 1 and self.available_tokens >= tokens:
+                    self.available_requests -= 1
+                    self.available_tokens -= tokens
+                    return
+
+                wait = max(
+                    (1 - self.available_requests) * 60 / self.rpm,
+                    (tokens - self.available_tokens) * 60 / self.tpm,
+                )
+                await asyncio.sleep(wait)
@@ -0,0 +1,24 @@
+import re
+from typing import Optional
+
+# The first "v" query parameter is the one YouTube plays, so the lazy prefix stops at it
+# and the ID used as cache key is always the one of the video that is downloaded
+YOUTUBE_URL_REGEX = re.compile(
+    r"^https://(?:www\.youtube\.com/(?:watch\?(?:[^#]*?&)??v=|(?:shorts|embed|live)/)|youtu\.be/)"
+    r"([A-Za-z0-9_-]{11})(?:[&?#/]|$)"
+)
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v={video_id}"
+
+
+def extract_video_id(video_url: str) -> Optional[str]:
+    """
+    Validates a YouTube video URL and extracts its video ID.
+
+    Args:
+        video_url (str): The URL of the YouTube video.
+
+    Returns:
+        str or None: The video ID, or None if the URL is not a valid YouTube video URL.
+    """
+    match = YOUTUBE_URL_REGEX.match(video_url)
+    return match.group(1) if match else None
@@ -3,31 +3,85 @@ from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import NoTranscriptFound
 
 import os
+import uuid
+import asyncio
+import tempfile
+import threading
+import contextlib
 import aiofiles
+import logging
 
 from src.audio_transcriber import (
-    AssemblyAITranscriber,
-    AudioTranscriber,
     AsyncAudioTranscriber,
     AsyncAssemblyAITranscriber,
+    AsyncWhisperCppTranscriber,
+    AynscWhisperTranscriber,
 )
+from src.utils.video_url import YOUTUBE_WATCH_URL, extract_video_id
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_WRITE_BUFFER_SIZE = 1 << 16
+
+# mkstemp creates files readable by their owner only, saved transcripts get the mode
+# of a regular file instead (the umask can only be read by setting it, hence once here)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+TRANSCRIPT_FILE_MODE = 0o666 & ~_UMASK
+
+TRANSCRIBER_BACKENDS = {
+    "assemblyai": AsyncAssemblyAITranscriber,
+    "whisper": AynscWhisperTranscriber,
+    "whispercpp": AsyncWhisperCppTranscriber,
+}
+
+
+class AudioDownloadCancelled(Exception):
+    """
+    Raised in the download thread to stop a speculative audio download that is no longer needed.
+    """
+
+
+def create_transcriber(backend=None) -> AsyncAudioTranscriber:
+    """
+    Builds the audio transcriber of the selected backend.
+
+    Args:
+        backend (str, optional): One of "assemblyai", "whisper" or "whispercpp". Default is None, which reads
+            the TRANSCRIBER_BACKEND environment variable and falls back to "assemblyai".
+
+    Returns:
+        AsyncAudioTranscriber: The audio transcriber.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = (backend or os.getenv("TRANSCRIBER_BACKEND", "assemblyai")).lower()
+    if backend not in TRANSCRIBER_BACKENDS:
+        raise ValueError(
+            f"Unknown transcriber backend {backend!r}, expected one of: {', '.join(TRANSCRIBER_BACKENDS)}"
+        )
+    return TRANSCRIBER_BACKENDS[backend]()
 
 
 class VideoDownloader:
     """
     A class that handles downloading video transcripts and audio from YouTube.
 
+    This is a synchronous wrapper around AsyncVideoDownloader, running its coroutines on a dedicated event loop.
+
     Attributes:
         transcript_dir (str): The directory to save downloaded transcripts.
         audio_dir (str): The directory to save downloaded audio files.
     """
 
     def __init__(self, transcript_dir="transcripts", audio_dir="audio"):
-        self.transcriber: AudioTranscriber = AssemblyAITranscriber()
+        self.downloader = AsyncVideoDownloader(
+            transcript_dir=transcript_dir, audio_dir=audio_dir
+        )
         self.transcript_dir = transcript_dir
         self.audio_dir = audio_dir
-        os.makedirs(self.transcript_dir, exist_ok=True)
-        os.makedirs(self.audio_dir, exist_ok=True)
+        self.runner = asyncio.Runner()
 
     def get_transcript(self, video_url, language):
         """
@@ -38,24 +92,10 @@ class VideoDownloader:
             language (str): The language of the transcript to download.
 
         Returns:
-            None
+            str: The transcript of the video.
         """
         video_id = self.get_video_id(video_url)
-        transcript = self._download_transcript(video_id, language)
-
-        if transcript:
-            print(f"Human transcript downloaded for video: {video_id}")
-            transcript = "".join(obj["text"] for obj in transcript)
-        else:
-            audio_file = self._download_audio(video_url)
-            print(f"Audio downloaded for video: {video_id}")
-            print("Transcribing audio...")
-            transcript = self._transcribe_audio(audio_file, language)
-            print("Transcription complete.")
-
-        self._save_transcript(transcript, video_id, language)
-        print(f"Transcript saved for video: {video_id}")
-        return transcript
+        return self.runner.run(self.downloader.get_transcript(video_id, language))
 
     def get_video_id(self, video_url):
         """
@@ -67,72 +107,7 @@ class VideoDownloader:
         Returns:
             str: The video ID.
         """
-        return YouTube(video_url).video_id
-
-    def _download_transcript(self, video_id, language):
-        """
-        Downloads the transcript for a given YouTube video.
-
-        Args:
-            video_id (str): The ID of the YouTube video.
-            language (str): The language of the transcript to download.
-
-        Returns:
-            str or None: The downloaded transcript, or None if not available.
-        """
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-        try:
-            transcript = transcript_list.find_manually_created_transcript([language])
-        except NoTranscriptFound:
-            return None
-        return transcript.fetch() if transcript else None
-
-    def _save_transcript(self, transcript, video_id, language) -> str:
-        """
-        Saves the transcript to a file.
-
-        Args:
-            transcript (str): The transcript to save.
-            video_id (str): The ID of the YouTube video.
-            language (str): The language of the transcript.
-
-        Returns:
-            None
-        """
-        filename = f"{video_id}_{language}.txt"
-        filepath = os.path.join(self.transcript_dir, filename)
-        with open(filepath, "w", encoding="utf-8") as file:
-            file.write(transcript)
-        return str(filepath)
-
-    def _download_audio(self, video_url) -> str:
-        """
-        Downloads the audio for a given YouTube video.
-
-        Args:
-            video_url (str): The URL of the YouTube video.
-            video_id (str): The ID of the YouTube video.
-
-        Returns:
-            None
-        """
-        youtube = YouTube(video_url)
-        audio_stream = youtube.streams.filter(only_audio=True).first()
-        audio_path = audio_stream.download(output_path=self.audio_dir)
-        return audio_path
-
-    def _transcribe_audio(self, audio_file, language) -> str:
-        """
-        Transcribes the audio file.
-
-        Args:
-            audio_file (str): The path to the audio file.
-            language (str): The language of the audio file.
-
-        Returns:
-            str: The transcribed text.
-        """
-        return self.transcriber.transcribe(audio_file, language)
+        return self.runner.run(self.downloader.get_video_id(video_url))
 
 
 class AsyncVideoDownloader:
@@ -145,42 +120,60 @@ class AsyncVideoDownloader:
     """
 
     def __init__(self, transcript_dir="transcripts", audio_dir="audio"):
-        self.transcriber: AsyncAudioTranscriber = AsyncAssemblyAITranscriber()
+        self.transcriber: AsyncAudioTranscriber = create_transcriber()
         self.transcript_dir = transcript_dir
         self.audio_dir = audio_dir
         os.makedirs(self.transcript_dir, exist_ok=True)
         os.makedirs(self.audio_dir, exist_ok=True)
 
-    async def get_transcript(self, video_url, language):
+    async def get_transcript(self, video_id, language):
         """
         Downloads the transcript or audio for a given YouTube video asynchronously.
 
+        The video is identified by its ID rather than its URL, so that the caller's cache keys always
+        match the video that is downloaded.
+
         Args:
-            video_url (str): The URL of the YouTube video.
+            video_id (str): The ID of the YouTube video, as returned by get_video_id.
             language (str): The language of the transcript to download.
 
         Returns:
-            None
+            str: The transcript of the video.
         """
-        video_id = await self.get_video_id(video_url)
-        transcript = await self._download_transcript(video_id, language)
+        transcript = await self._load_transcript(video_id, language)
+        if transcript is not None:
+            logger.info("Saved transcript loaded for video: %s", video_id)
+            return transcript
+
+        # The audio is downloaded while looking for a human transcript, so that
+        # videos without captions don't wait for both steps one after the other
+        cancel_audio_download = threading.Event()
+        audio_task = asyncio.create_task(
+            self._download_audio(video_id, cancel_audio_download)
+        )
+        try:
+            transcript = await self._download_transcript(video_id, language)
+        except BaseException:
+            self._cancel_audio_download(audio_task, cancel_audio_download)
+            raise
 
         if transcript:
-            print(f"Human transcript downloaded for video: {video_id}")
+            logger.info("Human transcript downloaded for video: %s", video_id)
             transcript = "".join(obj["text"] for obj in transcript)
+            self._cancel_audio_download(audio_task, cancel_audio_download)
         else:
-            audio_file = await self._download_audio(video_url)
-            print(f"Audio downloaded for video: {video_id}")
-            print("Transcribing audio...")
+            audio_file = await audio_task
+            logger.info("Audio downloaded for video: %s", video_id)
+            logger.info("Transcribing audio...")
             transcript = await self._transcribe_audio(audio_file, language)
-            print("Transcription complete.")
+            logger.info("Transcription complete.")
             os.remove(audio_file)
-            print("Audio file deleted.")
+            logger.info("Audio file deleted.")
 
         await self._save_transcript(transcript, video_id, language)
-        print(f"Transcript saved for video: {video_id}")
+        logger.info("Transcript saved for video: %s", video_id)
         return transcript
-    
+
     async def get_video_id(self, video_url):
         """
         Extracts the video ID from a YouTube video URL.
@@ -190,9 +183,46 @@ class AsyncVideoDownloader:
 
         Returns:
             str: The video ID.
+
+        Raises:
+            ValueError: If the URL is not a supported YouTube video URL.
+        """
+        video_id = extract_video_id(video_url)
+        if not video_id:
+            raise ValueError(f"Could not extract the video ID from URL: {video_url}")
+        return video_id
+
+    def _get_transcript_path(self, video_id, language) -> str:
+        """
+        Builds the path of the saved transcript of a video.
+
+        Args:
+            video_id (str): The ID of the YouTube video.
+            language (str): The language of the transcript.
+
+        Returns:
+            str: The path to the transcript file.
         """
-        return YouTube(video_url).video_id
-    
+        return os.path.join(self.transcript_dir, f"{video_id}_{language}.txt")
+
+    async def _load_transcript(self, video_id, language):
+        """
+        Loads a previously saved transcript asynchronously.
+
+        Args:
+            video_id (str): The ID of the YouTube video.
+            language (str): The language of the transcript.
+
+        Returns:
+            str or None: The saved transcript, or None if it has not been saved yet.
+        """
+        filepath = self._get_transcript_path(video_id, language)
+        if not os.path.exists(filepath):
+            return None
+
+        async with aiofiles.open(filepath, "r", encoding="utf-8") as file:
+            return await file.read()
+
     async def _download_transcript(self, video_id, language):
         """
         Downloads the transcript for a given YouTube video.
@@ -204,27 +234,89 @@ class AsyncVideoDownloader:
         Returns:
             str or None: The downloaded transcript, or None if not available.
         """
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+        transcript_list = await asyncio.to_thread(
+            YouTubeTranscriptApi.list_transcripts, video_id
+        )
         try:
             transcript = transcript_list.find_manually_created_transcript([language])
         except NoTranscriptFound:
             return None
-        return transcript.fetch() if transcript else None
+        return await asyncio.to_thread(transcript.fetch) if transcript else None
 
-    async def _download_audio(self, video_url):
+    async def _download_audio(self, video_id, cancel_event=None):
         """
         Downloads the audio for a given YouTube video asynchronously.
 
         Args:
-            video_url (str): The URL of the YouTube video.
+            video_id (str): The ID of the YouTube video.
+            cancel_event (threading.Event, optional): Once set, the download is stopped at its next chunk and
+                the partial file is removed. Default is None.
 
         Returns:
             str: The path to the downloaded audio file.
+
+        Raises:
+            AudioDownloadCancelled: If the download was stopped through cancel_event.
         """
-        youtube = YouTube(video_url)
-        audio_stream = youtube.streams.filter(only_audio=True).first()
-        audio_path = audio_stream.download(output_path=self.audio_dir)
-        return audio_path
+
+        def check_cancelled(*args):
+            if cancel_event is not None and cancel_event.is_set():
+                raise AudioDownloadCancelled
+
+        # pytube calls must never run on the event loop thread since they perform blocking HTTP requests
+        def download():
+            youtube = YouTube(
+                YOUTUBE_WATCH_URL.format(video_id=video_id),
+                on_progress_callback=check_cancelled,
+            )
+            audio_stream = youtube.streams.filter(only_audio=True).first()
+            check_cancelled()
+
+            # pytube names the file after the video title, a unique prefix keeps concurrent
+            # downloads of the same video (e.g. in another language) from sharing a file
+            filename_prefix = f"{uuid.uuid4().hex}_"
+            try:
+                return audio_stream.download(
+                    output_path=self.audio_dir, filename_prefix=filename_prefix
+                )
+            except AudioDownloadCancelled:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(
+                        audio_stream.get_file_path(
+                            output_path=self.audio_dir, filename_prefix=filename_prefix
+                        )
+                    )
+                raise
+
+        return await asyncio.to_thread(download)
+
+    def _cancel_audio_download(self, audio_task, cancel_event):
+        """
+        Stops a speculative audio download that turned out not to be needed, and deletes its file.
+
+        The task itself is not cancelled, since its download thread would keep running and leave
+        its file behind, the thread stops at its next chunk instead.
+
+        Args:
+            audio_task (asyncio.Task): The audio download task.
+            cancel_event (threading.Event): The cancellation event of the download.
+        """
+        cancel_event.set()
+        audio_task.add_done_callback(self._remove_downloaded_audio)
+
+    @staticmethod
+    def _remove_downloaded_audio(audio_task):
+        """
+        Deletes the audio file of a speculative download that turned out not to be needed.
+
+        Args:
+            audio_task (asyncio.Task): The finished audio download task.
+        """
+        if audio_task.cancelled() or audio_task.exception() is not None:
+            return
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(audio_task.result())
+        logger.info("Unused audio file deleted.")
 
     async def _save_transcript(self, transcript, video_id, language) -> str:
         """
@@ -238,11 +330,29 @@ class AsyncVideoDownloader:
         Returns:
             str: The path to the saved transcript file.
         """
-        filename = f"{video_id}_{language}.txt"
-        filepath = os.path.join(self.transcript_dir, filename)
-
-        async with aiofiles.open(filepath, "w", encoding="utf-8") as file:
-            await file.write(transcript)
+        filepath = self._get_transcript_path(video_id, language)
+
+        # The transcript is written to a temporary file first so that a crash
+        # never leaves a partial transcript behind to be loaded later on, each
+        # writer gets its own file since workers may save the same video at once
+        fd, tmp_filepath = tempfile.mkstemp(
+            dir=self.transcript_dir, prefix=f"{video_id}_{language}.", suffix=".tmp"
+        )
+        os.close(fd)
+        try:
+            os.chmod(tmp_filepath, TRANSCRIPT_FILE_MODE)
+            async with aiofiles.open(
+                tmp_filepath,
+                "w",
+                encoding="utf-8",
+                buffering=TRANSCRIPT_WRITE_BUFFER_SIZE,
+            ) as file:
+                await file.write(transcript)
+            await asyncio.to_thread(os.replace, tmp_filepath, filepath)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_filepath)
+            raise
 
         return str(filepath)
 
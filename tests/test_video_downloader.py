@@ -0,0 +1,46 @@
+import pytest
+
+video_downloader = pytest.importorskip("src.video_downloader")
+
+
+class FakeTranscriber:
+    async def transcribe(self, audio_file, language_code):
+        return ""
+
+
+class OtherFakeTranscriber(FakeTranscriber):
+    pass
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    monkeypatch.setattr(
+        video_downloader,
+        "TRANSCRIBER_BACKENDS",
+        {"assemblyai": FakeTranscriber, "whispercpp": OtherFakeTranscriber},
+    )
+
+
+def test_create_transcriber_defaults_to_assemblyai(backends, monkeypatch):
+    monkeypatch.delenv("TRANSCRIBER_BACKEND", raising=False)
+    assert type(video_downloader.create_transcriber()) is FakeTranscriber
+
+
+def test_create_transcriber_reads_the_backend_from_the_environment(
+    backends, monkeypatch
+):
+    monkeypatch.setenv("TRANSCRIBER_BACKEND", "WhisperCpp")
+    assert type(video_downloader.create_transcriber()) is OtherFakeTranscriber
+
+
+def test_create_transcriber_rejects_unknown_backends(backends):
+    with pytest.raises(ValueError):
+        video_downloader.create_transcriber("unknown")
+
+
+def test_downloader_uses_the_selected_backend(backends, monkeypatch, tmp_path):
+    monkeypatch.setenv("TRANSCRIBER_BACKEND", "whispercpp")
+    downloader = video_downloader.AsyncVideoDownloader(
+        transcript_dir=str(tmp_path / "transcripts"), audio_dir=str(tmp_path / "audio")
+    )
+    assert type(downloader.transcriber) is OtherFakeTranscriber
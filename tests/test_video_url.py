@@ -0,0 +1,43 @@
+import pytest
+
+from src.utils.video_url import extract_video_id
+
+
+@pytest.mark.parametrize(
+    "video_url, video_id",
+    [
+        ("https://www.youtube.com/watch?v=AAAAAAAAAAA", "AAAAAAAAAAA"),
+        ("https://www.youtube.com/watch?feature=share&v=AAAAAAAAAAA", "AAAAAAAAAAA"),
+        ("https://www.youtube.com/watch?v=AAAAAAAAAAA&t=42s", "AAAAAAAAAAA"),
+        ("https://www.youtube.com/shorts/AAAAAAAAAAA", "AAAAAAAAAAA"),
+        ("https://www.youtube.com/embed/AAAAAAAAAAA?start=10", "AAAAAAAAAAA"),
+        ("https://www.youtube.com/live/AAAAAAAAAAA", "AAAAAAAAAAA"),
+        ("https://youtu.be/AAAAAAAAAAA?si=xyz", "AAAAAAAAAAA"),
+    ],
+)
+def test_extract_video_id(video_url, video_id):
+    assert extract_video_id(video_url) == video_id
+
+
+def test_extract_video_id_takes_the_first_v_parameter():
+    video_url = "https://www.youtube.com/watch?v=AAAAAAAAAAA&v=BBBBBBBBBBB"
+    assert extract_video_id(video_url) == "AAAAAAAAAAA"
+
+
+def test_extract_video_id_ignores_the_fragment():
+    video_url = "https://www.youtube.com/watch?t=1#&v=BBBBBBBBBBB"
+    assert extract_video_id(video_url) is None
+
+
+@pytest.mark.parametrize(
+    "video_url",
+    [
+        "https://example.com/watch?v=AAAAAAAAAAA",
+        "http://www.youtube.com/watch?v=AAAAAAAAAAA",
+        "https://www.youtube.com/watch?v=AAAAAAAAAA",
+        "https://www.youtube.com/watch?v=AAAAAAAAAAAA",
+        "https://www.youtube.com/playlist?list=AAAAAAAAAAA",
+    ],
+)
+def test_extract_video_id_rejects_invalid_urls(video_url):
+    assert extract_video_id(video_url) is None